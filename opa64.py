@@ -9,18 +9,37 @@
 @usage
 $ python3 opa64.py fetch --doc=all --dir=data
 $ python3 opa64.py parse --doc=all --dir=data > db.raw.json
+$ python3 opa64.py compare --doc=all --dir=data
 $ python3 opa64.py split --db=db.raw.json > db.json
-
-The `fetch` command tries to download all the documents listed below as `urls`. If the argument
-is not `--doc=all`, such as `--doc=description` where `description` comes from the keys of `urls`,
-it fetches only the document. The `--doc` option allows multiple document keys. Nested elements
-in the `urls` (= `tables`) can be specified as `table.a78`.
+$ python3 opa64.py split --db=db.raw.json --format=sqlite --out=db.sqlite
+$ python3 opa64.py select --db=db.json --uarch=n1,a78 --latency=2
+$ python3 opa64.py analyze --db=db.json --uarch=n1 < kernel.s
+$ python3 opa64.py query vmlaq_s32 --index=db.idx --uarch=n1
+$ python3 opa64.py regress --db=db.raw.json --golden=db.json --baseline=regress.json
+$ python3 opa64.py delta --base=db.json --db=db.new.json --manifest=releases.json > db.new.delta.json
+$ python3 opa64.py export-sched --db=db.json --uarch=n1 > n1.sched.json
+$ python3 opa64.py loadtest --url=http://localhost:8080/ --concurrency=1,4,16
+
+The `fetch` command tries to download all the documents listed below as `urls`, which is picked
+from `releases` by `--release` (the latest one by default). If the argument is not `--doc=all`,
+such as `--doc=description` where `description` comes from the keys of `urls`, it fetches only
+the document. The `--doc` option allows multiple document keys. Nested elements in the `urls`
+(= `tables`) can be specified as `table.a78`.
 
 The `parse` command parses the pdf using Camelot library. If `--doc=all` option given, it parses
 all the documents listed in `urls` and concatenate them into single json. The root of the output
 json is dict, where two keys `metadata` and `insns` are always available. The `metadata` record
 keeps metadata for the document, such as path to the pdf. The `insns` record keeps the database
-as dict where canonized opcodes are used as keys.
+as dict where canonized opcodes are used as keys. `--engine=text` replaces Camelot with the text
+layout given by pdfminer, which is faster and needs neither OpenCV nor Ghostscript, but is less
+accurate on wrapped cells. The `compare` command runs both engines on each document and reports
+their speed and how many table rows agree.
+
+Parsed result of each document is cached in `<dir>/cache/parse` keyed by hash of the document,
+so building another release only parses documents that changed from the previous one. Pages
+rendered by Ghostscript inside Camelot, and lines detected on them, are also cached in
+`<dir>/cache/render`, so that re-parsing the same document skips rasterization. `--no-cache`
+disables both.
 
 The `split` command takes the output of the `parse` command and compute appropriate opcode-to-
 -description and opcode-to-table (latency / throughput table parsed from Optimization Guides)
@@ -30,28 +49,92 @@ form or variant, we have to split and link them appropriately. The output of thi
 also json, which contains `metadata` and `insns` keys as in the `parse` result. The output of
 `split` is feeded into `opv86.js` without modification. Note that keys in `insns` record is
 converted to shorthand forms, `instr-class` -> `ic`, `feature` -> `ft`, ..., to reduce the size
-of the output.
+of the output. Descriptions (`ds`) are shared by many records, such as intrinsics of `add` or `ld1`,
+so they are stored only once in the `descs` array and each record keeps the index to it.
+Latency, throughput, and pipes in the tables are also normalized into numbers and pipe sets
+(`nl`, `nr`, `np`), and indexed per uArch in the `index` record for sorting and comparison.
+
+`split --format=sqlite --out=db.sqlite` writes the same database into sqlite tables, `records`,
+`descs`, `asms`, `timings` (one row per uArch and variant, with the normalized numbers), and
+`macros`, with fts5 full-text index `search` over opcodes, intrinsics, asm templates, and
+descriptions. The `select`, `analyze`, and `query` commands accept it in place of json or index,
+and answer from the indexed tables without loading the whole database (except with `--delta`).
+
+The `select` command queries the output of `split` with the normalized timings; `--latency`
+selects records whose latency is within the value on all the `--uarch`, and `--slower=a76:a78`
+selects records that got slower between the two uArchs.
+
+The `analyze` command estimates latency and throughput of a sequence of instructions, given as
+assembly or intrinsics calls one per line, in the similar way to llvm-mca. Each line is resolved
+to a record through the mnemonics (`bf.op` and `bf.as`) or the intrinsic name (`bf.it`), and the
+slowest row of the `--uarch` table is used. Lines without a record of the operand class, such as
+general-purpose forms of ops that have simd intrinsics (which have no table), are reported as
+unresolved. It reports the critical path latency, the latency carried over iterations when the
+sequence is a loop body, per-pipe pressure, and the bound of the steady-state throughput.
+Register pairs of `ldp` and base registers written back by pre- / post-index addressing are
+tracked as destinations; dependencies through memory and condition flags are not.
+
+The `query` command looks up records by opcode, mnemonic, or intrinsic name without loading the
+json. It reads the binary index written by `split --index=db.idx`, which is memory-mapped and
+binary-searched, so lookups finish in a few milliseconds. `--batch` reads terms from stdin.
+
+The `regress` command runs `split` on a frozen `parse` output and diffs the result against golden
+`split` output record by record. It also measures time and peak memory of each stage of `split`,
+and checks them against the budgets given by `--budget` or derived from the `--baseline` of the
+previous run. The baseline also keeps how deep in the matching cascade of `filter_descs_and_tables`
+each record was found, and records that moved to a deeper (slower) level are reported.
+`--update` saves the result as the new baseline.
+
+The `delta` command compares `split` outputs of two releases and writes records and descriptions
+that are new in the latter, with references to unchanged records of the former. The front-end
+lists the deltas in `releases.json` and switches releases by downloading only the delta, and
+`select` and `analyze` take it as `--delta`.
+
+The `export-sched` command writes the latency / throughput tables of a uArch as a scheduling model
+in json, for static analyzers and cost models. Each instruction form (opcode, class, and variant)
+has latency, reciprocal throughput, pipes, and link to the source page. Pipe names are mapped to
+units common to all the guides, such as `fp-simd0` for `V0` and `F0`, as listed in `units`.
+
+The `loadtest` command replays sessions of the page against the server started by `make start`:
+the page and scripts, a cold load of `data/db.json`, and range requests to the pdfs linked from
+it. It reports throughput and latency percentiles at each `--concurrency` level, along with the
+latency of search queries, which run in the browser and are replayed on the fetched database.
+Range requests answered with the whole file (`make start` ignores `Range`) are counted as `pdf-full`.
 """
 import argparse
-import camelot
+import bisect
+import collections
 import functools
+import hashlib
 import itertools
 import json
+import math
+import mmap
 import os
+import pickle
+import random
 import re
-import requests
+import shutil
+import sqlite3
+import struct
 import subprocess
 import sys
 import tarfile
+import threading
 import time
+import tracemalloc
 import xml.etree.ElementTree
 
+# camelot (with opencv and ghostscript behind it) and requests are imported inside fetch and parse functions,
+# as they take far longer to load than the other subcommands take to run
+
 # hardcoded: sanitization table
 conv_singleline = str.maketrans({ '\t': '', '\xa0': '', '\xad': '', '‐': '', '\n': '', '\r': '' })
 conv_multiline  = str.maketrans({ '\t': '', '\xa0': '', '\xad': '', '‐': '' })
 
-# hardcoded: doc url
-urls = {
+# hardcoded: doc url for each release, oldest first; documents shared between releases are fetched and parsed only once
+releases = dict()
+releases['v86A-2020-03'] = {
 	'description': 'https://developer.arm.com/-/media/developer/products/architecture/armv8-a-architecture/2020-03/A64_ISA_xml_v86A-2020-03.tar.gz',
 	'intrinsics': 'https://static.docs.arm.com/ihi0073/e/IHI0073E_arm_neon_intrinsics_ref.pdf',
 	'table': {
@@ -68,6 +151,8 @@ urls = {
 	},
 	'macros': 'https://static.docs.arm.com/101028/0011/ACLE_Q2_2020_101028_Final.pdf'
 }
+release = list(releases.keys())[-1]	# the latest one by default; overridden by `--release`
+urls = releases[release]
 macro_page_range = '34-39'			# make sure the range covers entire list of feature macros
 
 
@@ -148,7 +233,8 @@ def error(msg):
 
 # utils
 def to_filepath(url, base):
-	return(base + '/' + url.split('/')[-1])
+	# prefixed with hash of the url, as revisions of a document often keep the same filename under another path
+	return(base + '/' + hashlib.sha1(url.encode('UTF-8')).hexdigest()[:8] + '.' + url.split('/')[-1])
 
 def extract_filename(path):
 	return(path.split('/')[-1])
@@ -176,6 +262,7 @@ def fetch_file(url, base = '.', verify = True):
 	if os.path.exists(path): return(path)
 
 	# if not, download it
+	import requests
 	def fetch_file_intl(url, verify):
 		with requests.get(url, verify = verify) as r:
 			f = open(path, 'wb')
@@ -193,6 +280,143 @@ def fetch_file(url, base = '.', verify = True):
 
 
 
+# pdf table extraction engines; each takes path and page range ('all' or '34-39'), and returns list of
+# PdfTable, which holds page number and rows (list of list of cell strings), the first row being the header.
+# `camelot` is the default, and `text` is the lightweight alternative built on the text layout of pdfminer,
+# which needs neither opencv nor ghostscript.
+PdfTable = collections.namedtuple('PdfTable', ['page', 'rows'])
+pdf_engine = 'camelot'		# set by `--engine`
+cache_dir = None			# set by `--dir` unless `--no-cache`
+
+def sanitize_rows(rows, width):
+	# lowercase, remove newlines and so on, and pad to width
+	rows = [[x.translate(conv_singleline).lower() for x in r] + [''] * (width - len(r)) for r in rows]
+	return(rows if len(rows) > 0 else [[''] * width])
+
+def expand_page_range(pages):
+	# '34-39,41' -> [34, 35, ..., 39, 41], None for 'all'
+	if pages == 'all': return(None)
+	ranges = [[int(y) for y in x.split('-')] for x in pages.split(',')]
+	return(sum([list(range(r[0], r[-1] + 1)) for r in ranges], []))
+
+# camelot (lattice) renders each page into image with ghostscript to detect ruled lines, which is the slowest
+# part of parsing. the rendered images and the detected lines are cached in `<cache_dir>/render`, keyed by
+# hash of the document, page number, and render / threshold settings.
+def enable_render_cache(path):
+	import camelot
+	from camelot.parsers import lattice
+	if cache_dir == None: return(False)
+	if not hasattr(lattice.Lattice, '_generate_image') or not hasattr(lattice, 'find_lines'):
+		message('render cache disabled; unsupported camelot version')
+		return(False)
+
+	render_dir = '/'.join([cache_dir, 'render'])
+	os.makedirs(render_dir, exist_ok = True)
+	with open(path, 'rb') as f: doc_hash = hashlib.sha1(f.read()).hexdigest()[:16]
+	state = { 'page': None }
+
+	# files are written to temporary then renamed, as parsers might run concurrently
+	def load_or_store(cache, load, generate, store):
+		if os.path.exists(cache): return(load(cache))
+		ret = generate()
+		store(cache + '.tmp', ret)
+		os.replace(cache + '.tmp', cache)
+		return(ret)
+
+	# originals are kept on the first call, so that patching twice does not nest the caches
+	(generate_image, find_lines) = getattr(lattice, '_opa64_originals', (lattice.Lattice._generate_image, lattice.find_lines))
+	lattice._opa64_originals = (generate_image, find_lines)
+
+	def generate_image_cached(self):
+		m = re.search(r'page-(\d+)\.pdf$', self.filename)
+		page = m.group(1) if m != None else extract_filename(self.filename)
+		key = '.'.join([doc_hash, page, str(getattr(self, 'resolution', '')), camelot.__version__])
+		state['page'] = '.'.join([key] + [str(getattr(self, x, '')) for x in ['process_background', 'threshold_blocksize', 'threshold_constant']])
+
+		def load(cache):
+			self.imagename = ''.join([self.rootname, '.png'])
+			shutil.copyfile(cache, self.imagename)
+		load_or_store('/'.join([render_dir, key + '.png']), load, lambda: generate_image(self), lambda tmp, _: shutil.copyfile(self.imagename, tmp))
+
+	def find_lines_cached(threshold, *args, **kwargs):
+		if state['page'] == None: return(find_lines(threshold, *args, **kwargs))
+		h = hashlib.sha1(repr((args, sorted(kwargs.items()))).encode('UTF-8')).hexdigest()[:16]
+		def load(cache):
+			with open(cache, 'rb') as f: return(pickle.load(f))
+		def store(tmp, lines):
+			with open(tmp, 'wb') as f: pickle.dump(lines, f)
+		return(load_or_store('/'.join([render_dir, '{}.{}.lines.pickle'.format(state['page'], h)]), load, lambda: find_lines(threshold, *args, **kwargs), store))
+
+	lattice.Lattice._generate_image = generate_image_cached
+	lattice.find_lines = find_lines_cached
+	return(True)
+
+def read_tables_camelot(path, pages = 'all'):
+	import camelot
+	enable_render_cache(path)
+	return([PdfTable(t.page, t.df.values.tolist()) for t in camelot.read_pdf(path, pages = pages)])
+
+def read_tables_text(path, pages = 'all'):
+	from pdfminer.high_level import extract_pages
+	from pdfminer.layout import LAParams, LTTextBox
+
+	def collect_boxes(e):
+		if isinstance(e, LTTextBox): return([e])
+		return(sum([collect_boxes(x) for x in e], []) if hasattr(e, '__iter__') else [])
+
+	# cells are text boxes; boxes whose tops are aligned form a row
+	def group_rows(boxes):
+		rows = []
+		for b in sorted(boxes, key = lambda b: (-b.y1, b.x0)):
+			if len(rows) > 0 and abs(rows[-1][0].y1 - b.y1) < 3.0:
+				rows[-1].append(b)
+				continue
+			rows.append([b])
+		return([sorted(r, key = lambda b: b.x0) for r in rows])
+
+	# runs of rows with two or more cells, closely stacked, are tables; columns are given by the first (header) row
+	def split_tables(rows):
+		tables = []
+		for r in rows:
+			if len(r) < 2: continue
+			prev = tables[-1][-1] if len(tables) > 0 else None
+			gap = min([b.y0 for b in prev]) - max([b.y1 for b in r]) if prev != None else None
+			if prev == None or gap > 2.0 * max([b.height / max(len(b), 1) for b in prev]) or len(r) > len(tables[-1][0]):
+				tables.append([r])
+				continue
+			tables[-1].append(r)
+		return(tables)
+
+	def to_cells(table):
+		bounds = [b.x0 - 3.0 for b in table[0]][1:]
+		rows = []
+		for r in table:
+			cells = [''] * len(table[0])
+			for b in r:
+				k = bisect.bisect_right(bounds, b.x0)
+				cells[k] = (cells[k] + '\n' + b.get_text().strip('\n')).strip('\n')
+			rows.append(cells)
+		return(rows)
+
+	page_numbers = expand_page_range(pages)
+	laparams = LAParams(char_margin = 1.0, line_margin = 0.3)
+	tables = []
+	for i, layout in enumerate(extract_pages(path, page_numbers = [x - 1 for x in page_numbers] if page_numbers != None else None, laparams = laparams)):
+		page = str(page_numbers[i] if page_numbers != None else i + 1)		# camelot gives page as string
+		tables.extend([PdfTable(page, to_cells(t)) for t in split_tables(group_rows(collect_boxes(layout)))])
+	return(tables)
+
+pdf_engines = {
+	'camelot': read_tables_camelot,
+	'text':    read_tables_text
+}
+
+def read_pdf_tables(path, pages = 'all'):
+	return(pdf_engines[pdf_engine](path, pages))
+
+
+
+
 # parse
 def parse_insn_table(path, page_range = 'all'):
 	# I suppose all opcodes appear in the table is in the canonical form. so no need for canonizing them.
@@ -219,15 +443,15 @@ def parse_insn_table(path, page_range = 'all'):
 		return([x.strip(' ') for x in var_str.split(',')])
 
 	# load table
-	tables = camelot.read_pdf(path, pages = page_range)
+	tables = read_pdf_tables(path, page_range)
 
 	# parse table into opcode -> (form, latency, throughput, pipes, notes) mappings
 	insns = dict()
 	for t in tables:
-		df = t.df.applymap(lambda x: x.translate(conv_singleline).lower())
-		if not df[0][0].startswith('instruction'): continue
-		if not df[1][0].startswith('aarch64'): continue
-		ops = sum([[(op_canon, op_raw, r) for op_canon, op_raw in parse_opcodes(r[1])] for i, r in df.iterrows() if i != 0], [])
+		rows = sanitize_rows(t.rows, 6)
+		if not rows[0][0].startswith('instruction'): continue
+		if not rows[0][1].startswith('aarch64'): continue
+		ops = sum([[(op_canon, op_raw, r) for op_canon, op_raw in parse_opcodes(r[1])] for r in rows[1:]], [])
 		for op_canon, op_raw, r in ops:
 			if op_canon not in insns: insns[op_canon] = []
 			(iclass, itype) = parse_iclass_itype(r[0])
@@ -349,16 +573,15 @@ def parse_intrinsics(path, page_range = 'all'):
 		return(op_canon, op_raw, form, datatypes)
 
 	# load table
-	tables = camelot.read_pdf(path, pages = page_range)
+	tables = read_pdf_tables(path, page_range)
 
 	# parse table into opcode -> (intrinsics, arguments, mnemonic, result) mappings
 	insns = dict()
 	for t in tables:
-		# print(t.df)
-		df = t.df.applymap(lambda x: x.translate(conv_singleline).lower())
-		if not df[0][0].startswith('intrinsic'): continue
-		for i, r in df.iterrows():
-			if i == 0: continue
+		# print(t.rows)
+		rows = sanitize_rows(t.rows, 3)
+		if not rows[0][0].startswith('intrinsic'): continue
+		for r in rows[1:]:
 			seq_canon = recompose_sequence(r[2])
 			# print(seq_canon)
 			(op_canon, op_raw, form, datatypes) = parse_op_insns(r[0], seq_canon)
@@ -391,14 +614,13 @@ def parse_macros(path):
 		return(None, None)
 
 	# load table
-	tables = camelot.read_pdf(path, macro_page_range)
+	tables = read_pdf_tables(path, macro_page_range)
 	macros = dict()
 	for t in tables:
-		# print(t.df)
-		df = t.df.applymap(lambda x: x.translate(conv_singleline).lower())
-		if not df[0][0].startswith('macro name'): continue
-		for i, r in df.iterrows():
-			if i == 0: continue
+		# print(t.rows)
+		rows = sanitize_rows(t.rows, 1)
+		if not rows[0][0].startswith('macro name'): continue
+		for r in rows[1:]:
 			(feature, macro) = parse_macro_intl(r[0])
 			if feature == None: continue
 			macros[feature] = {
@@ -611,18 +833,38 @@ def parse_all(doc_list, base = '.'):
 			insns[insn]['description'] = descs
 		return(insns)
 
+	# parsed result is cached in `<cache_dir>/parse` for each document, keyed by hash of the document and this script,
+	# so that rebuilding another release reuses documents that did not change
+	def cache_path(doc):
+		url = urls[doc[0]] if len(doc) == 1 else urls[doc[0]].get(doc[1])
+		if type(url) is not str or not os.path.exists(to_filepath(url, base)): return(None)
+		path = to_filepath(url, base)
+		h = hashlib.sha1()
+		for x in [path, os.path.realpath(sys.argv[0])]:
+			with open(x, 'rb') as f: h.update(f.read())
+		return('/'.join([cache_dir, 'parse', '{}.{}.{}.json'.format('.'.join(doc), pdf_engine, h.hexdigest()[:16])]))
+
 	meta  = dict()
 	insns = dict()
 	for doc in docs:
-		# forks process, as workaround for a bug in ghostscript. calling some API in libgs.so,
-		# which is done inside camelot, makes `/etc/papersize` left open, and calling the API several hundred times
-		# uses up the fd resource of the operating system. to avoid this without fixing the bug is dividing parsing
-		# into multiple units and doing each in disjoint processes.
 		doc_str = '.'.join(doc)
-		cmd = '{} {} parse --doc={} --dir={}'.format(sys.executable, os.path.realpath(sys.argv[0]), doc_str, base)
-		message('parsing {}... (command: {})'.format(doc_str, cmd))
-		ret = subprocess.run(cmd, shell = True, capture_output = True)
-		db  = json.loads(ret.stdout)
+		cache = cache_path(doc) if doc[0] in urls and cache_dir != None else None
+		if cache != None and os.path.exists(cache):
+			message('parsing {}... (cached: {})'.format(doc_str, cache))
+			with open(cache) as f: db = json.load(f)
+		else:
+			# forks process, as workaround for a bug in ghostscript. calling some API in libgs.so,
+			# which is done inside camelot, makes `/etc/papersize` left open, and calling the API several hundred times
+			# uses up the fd resource of the operating system. to avoid this without fixing the bug is dividing parsing
+			# into multiple units and doing each in disjoint processes.
+			cmd = '{} {} parse --release={} --engine={} --doc={} --dir={}{}'.format(
+				sys.executable, os.path.realpath(sys.argv[0]), release, pdf_engine, doc_str, base, '' if cache_dir != None else ' --no-cache')
+			message('parsing {}... (command: {})'.format(doc_str, cmd))
+			ret = subprocess.run(cmd, shell = True, capture_output = True)
+			db  = json.loads(ret.stdout)
+			if cache != None:
+				os.makedirs(extract_base(cache), exist_ok = True)
+				with open(cache, 'w') as f: json.dump(db, f)
 
 		# update metadata db
 		meta = update_db(meta, doc, db['metadata'])
@@ -630,11 +872,109 @@ def parse_all(doc_list, base = '.'):
 		# update instruction db
 		fn = update_db if doc[0] != 'macros' else update_feature_macro
 		insns = fn(insns, doc, db['insns'])
+	meta['release'] = release
 	return({ 'metadata': meta, 'insns': insns })
 
 
 
 
+# compare pdf table extraction engines on speed and row-level agreement
+def compare_engines(doc_list, base = '.'):
+	docs = canonize_doc_list(doc_list)
+	if len(docs) > 1:
+		# one process per document, for the same reason as in parse_all
+		for doc in docs:
+			cmd = '{} {} compare --release={} --doc={} --dir={}{}'.format(
+				sys.executable, os.path.realpath(sys.argv[0]), release, '.'.join(doc), base, '' if cache_dir != None else ' --no-cache')
+			ret = subprocess.run(cmd, shell = True, capture_output = True)
+			sys.stdout.write(ret.stdout.decode('UTF-8'))
+		return(None)
+
+	doc = docs[0]
+	if doc[0] not in urls or doc[0] == 'description': return(None)
+	url = urls[doc[0]] if type(urls[doc[0]]) is str else urls[doc[0]].get(doc[1] if len(doc) > 1 else '')
+	if url == None or not os.path.exists(to_filepath(url, base)):
+		error('file not found for --doc={}'.format('.'.join(doc)))
+		return(None)
+	(path, pages) = (to_filepath(url, base), macro_page_range if doc[0] == 'macros' else 'all')
+
+	results = dict()
+	for engine, fn in pdf_engines.items():
+		t = time.monotonic()
+		tables = fn(path, pages)
+		elapsed = time.monotonic() - t
+		rows = set()
+		for table in tables:
+			rows |= set(['|'.join([x.strip(' ') for x in r]) for r in sanitize_rows(table.rows, 0)])
+		results[engine] = (elapsed, len(tables), rows)
+
+	(ref, alt) = ('camelot', 'text')
+	(common, union) = (results[ref][2] & results[alt][2], results[ref][2] | results[alt][2])
+	for engine, (elapsed, ntables, rows) in results.items():
+		print('{}\t{}\t{:.3f} s\t{} tables\t{} rows'.format('.'.join(doc), engine, elapsed, ntables, len(rows)))
+	print('{}\tagreement\t{:.1f}% rows in common, {:.1f}% of {} rows found by {}, {} {:.1f}x faster'.format(
+		'.'.join(doc), 100.0 * len(common) / max(len(union), 1),
+		100.0 * len(common) / max(len(results[ref][2]), 1), ref, alt,
+		alt, results[ref][0] / max(results[alt][0], 1e-6)))
+	return(None)
+
+
+
+# latency / throughput / pipes normalization; tables keep raw strings like '4(1)', '1/2', '5-6', and 'F0/F1, L'
+def parse_numbers(s):
+	# '1/2' is parsed as a fraction, others as integers or decimals
+	return([float(m.group(1)) / float(m.group(2)) if m.group(2) else float(m.group(1))
+		for m in re.finditer(r'(\d+(?:\.\d+)?)(?:\s*/\s*(\d+(?:\.\d+)?))?', s)])
+
+def normalize_latency(lt):
+	# numbers in parentheses are latencies for late-forwarded operands (accumulators), e.g. '4(1)'
+	main = parse_numbers(re.sub(r'\([^)]*\)', ' ', lt))
+	fwd  = parse_numbers(''.join(re.findall(r'\([^)]*\)', lt)))
+	if len(main) == 0: main = fwd
+	if len(main) == 0: return(None, None)
+	return([min(main), max(main)], min(fwd) if len(fwd) > 0 else None)
+
+def normalize_throughput(tp):
+	# instructions per cycle -> cycles per instruction (reciprocal throughput)
+	tps = [x for x in parse_numbers(tp) if x > 0]
+	if len(tps) == 0: return(None)
+	return([round(1.0 / max(tps), 4), round(1.0 / min(tps), 4)])
+
+def normalize_pipes(ip):
+	# 'F0/F1, L' -> [['f0', 'f1'], ['l']]; groups separated by comma are all used, alternatives by slash
+	groups = [re.findall(r'[a-z][a-z0-9]*', g) for g in re.split(r'[,;+&]| and ', ip.lower())]
+	return([sorted(set(g)) for g in groups if len(g) > 0])
+
+def normalize_table_row(row):
+	(lt, fw) = normalize_latency(row['lt'])
+	row['nl'] = lt
+	row['nr'] = normalize_throughput(row['tp'])
+	row['np'] = normalize_pipes(row['ip'])
+	if fw != None: row['nf'] = fw
+	return(row)
+
+# columnar index, uarch -> { 'id': record ids, 'lt': min latencies, 'lx': max latencies, 'rt': reciprocal throughputs },
+# holding the fastest row of each record and sorted by min latency for range queries
+def build_timing_index(insns):
+	cols = dict()
+	for i, insn in enumerate(insns):
+		if len(insn['tb']) == 0: continue
+		for arch, rows in insn['tb'].items():
+			rows = [r for r in rows if r['nl'] != None]
+			if len(rows) == 0: continue
+			best = min(rows, key = lambda r: (r['nl'][0], r['nr'][0] if r['nr'] != None else 0))
+			if arch not in cols: cols[arch] = []
+			cols[arch].append((best['nl'][0], best['nl'][1], best['nr'][1] if best['nr'] != None else None, i))
+
+	index = dict()
+	for arch, c in cols.items():
+		c.sort(key = lambda x: (x[0], x[3]))
+		index[arch] = { 'id': [x[3] for x in c], 'lt': [x[0] for x in c], 'lx': [x[1] for x in c], 'rt': [x[2] for x in c] }
+	return(index)
+
+
+
+
 # split and reorder database
 def merge_attrs(op_canon, attrs):
 	def is_op_in_asm(op_canon, attrs):
@@ -718,8 +1058,9 @@ def filter_descs_and_tables(op_canon, intr, descs, tables):
 			for d in ds: print(i, j, d)
 			return
 
+		# 'level' records how deep in the cascade the match was found, for regression check
 		if 'form' not in intr or len(intr['form']) == 0: return(None)
-		for form in combine_form(intr['form']):
+		for k, form in enumerate(combine_form(intr['form'])):
 			for i, fn1 in enumerate(fn1s):
 				filtered_descs = sum([[{ 'desc': d, 'attr': a } for a in d['attrs']] for d in descs], [])
 				# print_descs(i, 0, form, filtered_descs)
@@ -727,7 +1068,7 @@ def filter_descs_and_tables(op_canon, intr, descs, tables):
 					filtered_descs = list(filter(lambda x: fn2(fn1, intr, form, x), filtered_descs))
 					# print_descs(i, j + 1, form, filtered_descs)
 					if len(filtered_descs) == 0: break
-					if len(filtered_descs) == 1: return(filtered_descs[0])
+					if len(filtered_descs) == 1: return(dict(filtered_descs[0], level = (k * len(fn1s) + i) * len(fn2s) + j + 1))
 		return(None)
 
 		# for debugging
@@ -755,7 +1096,7 @@ def filter_descs_and_tables(op_canon, intr, descs, tables):
 	filtered_table = dict([(proc, filter_tables_by_form(filtered_descs['attr'], tables[proc])) for proc in tables])
 	return([(filtered_descs, filtered_table)])
 
-def split_insns(filename):
+def split_insns(filename, stats = None):
 	def find_or(d, k, o = ''):
 		return(d[k] if k in d else o)
 
@@ -797,7 +1138,7 @@ def split_insns(filename):
 				'ip': find_or(t, 'pipes'),
 				'pp': find_or(t, 'page'),
 			}
-			return(table)
+			return(normalize_table_row(table))
 
 		if len(ts) == 0: return(ts)
 		all    = set(sum([x['variant'] for x in sum([v for v in ts.values()], [])], []))
@@ -830,7 +1171,7 @@ def split_insns(filename):
 		tables = v['table'] if 'table' in v else dict()
 		intrs  = v['intrinsics'] if 'intrinsics' in v else [dict()]
 
-		if 'description' not in v: return([compose_blank(op_canon, i) for i in intrs])
+		if 'description' not in v: return([dict(compose_blank(op_canon, i), lv = -1) for i in intrs])
 
 		# for each instruction class
 		descs = v['description']
@@ -841,7 +1182,7 @@ def split_insns(filename):
 			# print(op_canon, intr)
 			xs = filter_descs_and_tables(op_canon, intr, descs, tables)
 			if xs == None: 
-				insns.append(compose_blank(op_canon, intr))
+				insns.append(dict(compose_blank(op_canon, intr), lv = -1))
 				continue
 			# print('desc: ', d)
 			# print('table: ', t)
@@ -849,7 +1190,8 @@ def split_insns(filename):
 				'bf': compose_brief(op_canon, intr, d),
 				'ds': compose_description(op_canon, intr, d),
 				'tb': compose_tables(ts),
-				'index': d['desc']['index']
+				'index': d['desc']['index'],
+				'lv': find_or(d, 'level', 0)
 			} for d, ts in xs])
 
 		# print(insns)
@@ -864,21 +1206,886 @@ def split_insns(filename):
 				'bf': compose_brief(op_canon, {}, d),
 				'ds': compose_description(op_canon, {}, d),
 				'tb': [],
-				'index': i
+				'index': i,
+				'lv': 0
 			})
 		for insn in insns: insn.pop('index', None)
 		return(insns)
 
-	# read json file
-	meta  = dict()
-	insns = []
-	with open(filename) as f:
-		db = json.load(f)
-		meta = db['metadata']
+	# replace description payload with id to the table of unique descriptions
+	def intern_descs(insns):
+		(descs, ids) = ([], dict())
+		for insn in insns:
+			ds  = insn['ds']
+			key = (ds['bf'], ds['dt'], ds['or'])
+			if key not in ids:
+				ids[key] = len(descs)
+				descs.append(ds)
+			insn['ds'] = ids[key]
+		return(descs, insns)
+
+	def load_raw(filename):
+		with open(filename) as f: return(json.load(f))
+
+	def split_all(db):
+		insns = []
 		for op, v in db['insns'].items(): insns.extend(split_insns_intl(op, v))
-	insns.sort(key = lambda x: x['bf']['op'] if 'bf' in x else '')
-	return({ 'metadata': meta, 'insns': insns })
+		return(insns)
+
+	def sort_insns(insns):
+		insns.sort(key = lambda x: x['bf']['op'] if 'bf' in x else '')
+		levels = [x.pop('lv') for x in insns]
+		return(insns, levels)
+
+	# each stage is timed (and its peak memory is taken if tracemalloc is running) when stats is given
+	def stage(name, fn, *args):
+		if stats == None: return(fn(*args))
+		if tracemalloc.is_tracing(): tracemalloc.reset_peak()
+		t = time.monotonic()
+		ret = fn(*args)
+		stats.setdefault('stages', dict())[name] = {
+			'time':   time.monotonic() - t,
+			'memory': tracemalloc.get_traced_memory()[1] if tracemalloc.is_tracing() else None
+		}
+		return(ret)
+
+	db = stage('load', load_raw, filename)
+	insns = stage('split', split_all, db)
+	(insns, levels) = stage('sort', sort_insns, insns)
+	(descs, insns) = stage('intern', intern_descs, insns)
+	index = stage('index', build_timing_index, insns)
+	if stats != None: stats['levels'] = levels
+	return({ 'metadata': db['metadata'], 'descs': descs, 'insns': insns, 'index': index })
+
+
+
+
+# delta between split databases of two releases; records identical to those in the base are referred to by
+# their index, and only changed or new records and descriptions are stored
+def build_delta(base_file, new_file, name = None, manifest = None):
+	(base, new) = (load_db(base_file), load_db(new_file))
+	def record_key(db, insn):
+		return(json.dumps({ 'bf': insn['bf'], 'ds': db['descs'][insn['ds']], 'tb': insn['tb'] }, sort_keys = True))
+
+	base_ids = dict()
+	for i, insn in enumerate(base['insns']): base_ids.setdefault(record_key(base, insn), []).append(i)
+	desc_ids = dict([(json.dumps(d, sort_keys = True), i) for i, d in enumerate(base['descs'])])
+
+	# order: index to base record if >= 0, or -(index to added record + 1)
+	(order, added, descs) = ([], [], [])
+	for insn in new['insns']:
+		ids = base_ids.get(record_key(new, insn), [])
+		if len(ids) > 0:
+			order.append(ids.pop(0))
+			continue
+		d = json.dumps(new['descs'][insn['ds']], sort_keys = True)
+		if d not in desc_ids:
+			desc_ids[d] = len(base['descs']) + len(descs)
+			descs.append(new['descs'][insn['ds']])
+		added.append(dict(insn, ds = desc_ids[d]))
+		order.append(-len(added))
+	message('delta: {} records reused, {} records and {} descriptions added'.format(len(order) - len(added), len(added), len(descs)))
+
+	name = name if name != None else new['metadata'].get('release', 'unknown')
+	delta = {
+		'release':  name,
+		'base':     base['metadata'].get('release', 'unknown'),
+		'metadata': new['metadata'],
+		'descs':    descs,
+		'order':    order,
+		'added':    added,
+		'index':    new['index']
+	}
+
+	# releases.json lists deltas that the front-end can switch to
+	if manifest != None:
+		m = { 'default': delta['base'], 'releases': [] }
+		if os.path.exists(manifest):
+			with open(manifest) as f: m = json.load(f)
+		m['releases'] = [x for x in m['releases'] if x['name'] != name] + [{ 'name': name, 'base': delta['base'], 'delta': 'db.{}.delta.json'.format(name) }]
+		with open(manifest, 'w') as f: json.dump(m, f, indent = 2)
+	return(delta)
+
+def apply_delta(base, delta):
+	# order refers to records of the base by position, so the delta is useless against another release
+	if base['metadata'].get('release', 'unknown') != delta['base']:
+		error('delta for {} is built against {}, not {}'.format(delta['release'], delta['base'], base['metadata'].get('release', 'unknown')))
+		return(None)
+	return({
+		'metadata': delta['metadata'],
+		'descs':    base['descs'] + delta['descs'],
+		'insns':    [base['insns'][i] if i >= 0 else delta['added'][-i - 1] for i in delta['order']],
+		'index':    delta['index']
+	})
+
+
+
+# differential regression check of split against golden output, with per-stage time and memory budgets
+def regress_split(filename, golden, baseline = None, budgets = [], update = False):
+	# records are compared with their descriptions resolved, so that ids in `descs` do not matter
+	def resolve(db, insn):
+		ds = insn['ds'] if type(insn['ds']) is dict else db['descs'][insn['ds']]
+		tb = dict([(k, [dict([(x, r[x]) for x in ['vr', 'lt', 'tp', 'ip', 'pp']]) for r in v]) for k, v in insn['tb'].items()]) if len(insn['tb']) > 0 else {}
+		return(json.dumps(insn['bf'], sort_keys = True), json.dumps({ 'ds': ds, 'tb': tb }, sort_keys = True))
+
+	def group(db):
+		recs = dict()
+		for i, insn in enumerate(db['insns']):
+			(k, v) = resolve(db, insn)
+			recs.setdefault(k, []).append((v, i))
+		return(recs)
+
+	# timing without tracemalloc overhead, then memory with tracemalloc
+	stats = dict()
+	db = split_insns(filename, stats)
+	mem = dict()
+	tracemalloc.start()
+	split_insns(filename, mem)
+	tracemalloc.stop()
+	for k in stats['stages']: stats['stages'][k]['memory'] = mem['stages'][k]['memory']
+
+	failed = False
+	with open(golden) as f: gdb = json.load(f)
+	(curr, prev) = (group(db), group(gdb))
+	for k in sorted(set(curr.keys()) | set(prev.keys())):
+		(cv, pv) = (sorted([x[0] for x in curr.get(k, [])]), sorted([x[0] for x in prev.get(k, [])]))
+		if cv == pv: continue
+		failed = True
+		bf = json.loads(k)
+		if len(cv) == 0: message('missing: {} {}'.format(bf['op'], bf['it']))
+		elif len(pv) == 0: message('added: {} {}'.format(bf['op'], bf['it']))
+		else: message('changed: {} {} ({} -> {} records)'.format(bf['op'], bf['it'], len(pv), len(cv)))
+
+	# cascade levels are kept per record (keyed by brief) in the baseline
+	levels = dict()
+	for k, v in curr.items(): levels[k] = max([stats['levels'][i] for _, i in v])
+	base = dict()
+	if baseline != None and os.path.exists(baseline):
+		with open(baseline) as f: base = json.load(f)
+	for k, lv in levels.items():
+		if k not in base.get('levels', {}) or lv <= base['levels'][k]: continue
+		bf = json.loads(k)
+		message('deeper match: {} {} (level {} -> {})'.format(bf['op'], bf['it'], base['levels'][k], lv))
+		failed = True
+
+	# budgets given as `stage=seconds[:megabytes]` override those derived from the baseline (x1.5 time, x1.25 memory)
+	limits = dict()
+	for k, v in base.get('stages', {}).items():
+		limits[k] = (v['time'] * 1.5 + 0.1, v['memory'] * 1.25 if v['memory'] != None else None)
+	for b in budgets:
+		(k, v) = b.split('=')
+		(t, m) = (v.split(':') + [None])[:2]
+		limits[k] = (float(t), float(m) * 1024 * 1024 if m != None else None)
+
+	for k, v in stats['stages'].items():
+		message('stage {:<8s} {:8.3f} s {:10.1f} MB'.format(k, v['time'], v['memory'] / 1024 / 1024))
+		if k not in limits: continue
+		(t, m) = limits[k]
+		if v['time'] > t:
+			message('over time budget: {} ({:.3f} s > {:.3f} s)'.format(k, v['time'], t))
+			failed = True
+		if m != None and v['memory'] > m:
+			message('over memory budget: {} ({:.1f} MB > {:.1f} MB)'.format(k, v['memory'] / 1024 / 1024, m / 1024 / 1024))
+			failed = True
+
+	hist = dict()
+	for lv in stats['levels']: hist[lv] = hist.get(lv, 0) + 1
+	message('cascade levels: {}'.format(', '.join(['{}: {}'.format(k, v) for k, v in sorted(hist.items())])))
+
+	if update and baseline != None:
+		with open(baseline, 'w') as f: json.dump({ 'stages': stats['stages'], 'levels': levels }, f)
+		message('baseline updated: {}'.format(baseline))
+	message('regression check {}'.format('failed' if failed else 'passed'))
+	return(not failed)
+
+
+
+# select records from split database with latency / throughput conditions
+def load_db(filename, delta = None):
+	if is_sqlite(filename):
+		db = read_sqlite(filename)
+	else:
+		with open(filename) as f: db = json.load(f)
+	if 'index' not in db: db['index'] = build_timing_index(db['insns'])
+	if delta == None: return(db)
+	with open(delta) as f: return(apply_delta(db, json.load(f)))
+
+# timing lookups for select and analyze, on the columnar index of a loaded database. TimingSqlite has the same
+# interface and answers from the tables without loading them
+class TimingDb:
+	def __init__(self, db):
+		(self.db, self.index, self.lookups) = (db, db['index'], dict())
+
+	def uarchs(self):
+		return(list(self.index.keys()))
+
+	def within(self, arch, max_latency = None):
+		# ids of records whose fastest row is within the latency; all records with the table for None
+		c = self.index[arch]
+		return(set(c['id'][:bisect.bisect_right(c['lt'], max_latency)] if max_latency != None else c['id']))
+
+	def timings(self, arch, ids = None):
+		# record id -> (min latency, reciprocal throughput) of the fastest row
+		c = self.index[arch]
+		return(dict([(i, x) for i, x in zip(c['id'], zip(c['lt'], c['rt'])) if ids == None or i in ids]))
+
+	def describe(self, i):
+		bf = self.db['insns'][i]['bf']
+		return(bf['op'], bf['it'] if bf['it'] != '' else self.db['descs'][self.db['insns'][i]['ds']]['bf'])
+
+	def lookup(self, uarch, kind, name):
+		# (id, record) pairs with the uarch table, by mnemonic or intrinsic function name
+		if uarch not in self.lookups: self.lookups[uarch] = build_insn_lookup(enumerate(self.db['insns']), uarch)
+		ids = find_in_lookup(self.lookups[uarch], kind, name)
+		return([(i, self.db['insns'][i]) for i in ids])
+
+	def pipes(self, uarch):
+		return(set([p for insn in self.db['insns'] if len(insn['tb']) > 0 for r in insn['tb'].get(uarch, []) for g in r['np'] for p in g]))
+
+	def close(self):
+		return(None)
 
+def open_timing_db(filename, delta = None):
+	# delta is applied to the whole database, so sqlite with delta is loaded as well; None if the delta does not apply
+	if delta == None and is_sqlite(filename): return(TimingSqlite(filename))
+	db = load_db(filename, delta)
+	return(TimingDb(db) if db != None else None)
+
+def select_insns(filename, uarchs, max_latency = None, slower = None, delta = None):
+	src = open_timing_db(filename, delta)
+	if src == None: return(None)
+	archs = src.uarchs()
+	for arch in uarchs + (slower.split(':') if slower != None else []):
+		if arch in archs: continue
+		error('no latency table for --uarch={}, one of {}'.format(arch, archs))
+		src.close()
+		return(None)
+
+	ids = None
+	if max_latency != None:
+		for arch in uarchs:
+			s = src.within(arch, max_latency)
+			ids = s if ids == None else ids & s
+	if slower != None:
+		(prev, curr) = [src.timings(x, ids) for x in slower.split(':')]
+		def is_slower(a, b):
+			if a[0] != b[0]: return(b[0] > a[0])
+			return(a[1] != None and b[1] != None and b[1] > a[1])
+		s = set([i for i in prev if i in curr and is_slower(prev[i], curr[i])])
+		ids = s if ids == None else ids & s
+	if ids == None: ids = set().union(*[src.within(arch) for arch in uarchs])
+
+	timings = dict([(arch, src.timings(arch, ids)) for arch in set(uarchs + (slower.split(':') if slower != None else []))])
+	def format_timing(arch, i):
+		if i not in timings[arch]: return('{}: -'.format(arch))
+		(lt, rt) = timings[arch][i]
+		return('{}: lt={:g} rt={}'.format(arch, lt, '-' if rt == None else '{:g}'.format(rt)))
+
+	for i in sorted(ids):
+		print('\t'.join(list(src.describe(i)) + [format_timing(arch, i) for arch in sorted(timings)]))
+	src.close()
+	return(True)
+
+
+
+
+# static throughput / latency analysis of instruction sequences, resolved through the split database
+acc_opcodes = ['mla', 'mls', 'fmla', 'fmls', 'fmlal', 'fmlsl', 'sdot', 'udot', 'usdot', 'sudot', 'bfdot', 'smmla', 'ummla', 'usmmla',
+	'smlal', 'umlal', 'smlsl', 'umlsl', 'sqdmlal', 'sqdmlsl', 'saba', 'uaba', 'sabal', 'uabal', 'sadalp', 'uadalp', 'ssra', 'usra', 'bsl', 'bif', 'bit',
+	'tbx', 'bfi', 'bfxil']
+
+def build_insn_lookup(insns, uarch):
+	# mnemonic -> record ids and intrinsic function name -> record ids from (id, record) pairs, only records with the uarch table
+	(by_mnemonic, by_intrinsic) = (dict(), dict())
+	for i, insn in insns:
+		if len(insn['tb']) == 0 or uarch not in insn['tb']: continue
+		bf = insn['bf']
+		asms = bf['as'] if type(bf.get('as')) is list else [bf.get('as', '')]
+		for mn in set([bf['op']] + [x.split(' ')[0] for x in asms if x != '']):
+			by_mnemonic.setdefault(mn, []).append(i)
+		m = re.search(r'(\w+)\s*\(', bf['it'])
+		if m != None: by_intrinsic.setdefault(m.group(1), []).append(i)
+	return(by_mnemonic, by_intrinsic)
+
+def find_in_lookup(lookup, kind, name):
+	(by_mnemonic, by_intrinsic) = lookup
+	return(by_intrinsic.get(name, []) if kind == 'intrinsic' else by_mnemonic.get(name, by_mnemonic.get(canonize_opcode(name), [])))
+
+def parse_asm_line(line):
+	# 'add v0.4s, v1.4s, v2.4s' -> ('add', ['v0.4s', 'v1.4s', 'v2.4s']); brackets and braces are kept as one operand
+	(mn, operands) = tuple((line.strip(' \t') + ' ').split(' ', 1))
+	(parts, depth, acc) = ([], 0, '')
+	for c in operands:
+		if c in '[{': depth += 1
+		if c in ']}': depth -= 1
+		if c == ',' and depth == 0:
+			parts.append(acc.strip(' \t'))
+			acc = ''
+			continue
+		acc += c
+	if acc.strip(' \t') != '': parts.append(acc.strip(' \t'))
+	return(mn.lower(), parts)
+
+def extract_registers(operand):
+	# 'v0.4s' / 'q0' / 'd0' -> 'v0', 'w1' / 'x1' -> 'x1', '{v0.4s, v1.4s}' -> ['v0', 'v1'], '[x0, #16]' -> ['x0']
+	regs = []
+	for r in re.findall(r'\b([vqdshbwxzp])(\d+)\b', operand.lower()):
+		regs.append(('x' if r[0] in 'wx' else 'z' if r[0] == 'z' else 'p' if r[0] == 'p' else 'v') + r[1])
+	if re.search(r'\b(sp|wsp)\b', operand.lower()): regs.append('sp')
+	return(regs)
+
+def operand_class(operand):
+	# instruction classes that the first operand suggests
+	if re.match(r'^\{?[vqdshb]\d+', operand.lower()): return('advsimd,fpsimd,float')
+	if re.match(r'^([wx](\d+|zr)|w?sp)$', operand.lower()): return('general')
+	if re.match(r'^\{?[zp]\d+', operand.lower()): return('sve')
+	return('')
+
+def parse_analyze_line(line):
+	# returns (kind, name, class, dsts, srcs, wbs) where kind is 'intrinsic' or 'asm'; None for blank lines, labels, and
+	# directives. stores, branches, and compares write no register (flags are not tracked), and load pairs write the first
+	# two operands. wbs are base registers written back by pre-index (`[x1, #16]!`) or post-index (`[x1], #16`) addressing
+	line = line.split('//')[0].split('/*')[0].strip(' \t\r\n;')
+	if line == '' or line.endswith(':') or line.startswith('.'): return(None)
+
+	m = re.match(r'^(?:[\w\s\*]*?\b(\w+)\s*=\s*)?(\w+)\s*\((.*)\)$', line)
+	if m != None:
+		args = [x.strip(' &*') for x in m.group(3).split(',')]
+		return('intrinsic', m.group(2), '', [m.group(1)] if m.group(1) != None else [], [x for x in args if re.match(r'^[A-Za-z_]\w*$', x)], [])
+	if re.match(r'^v\w+_\w+$', line): return('intrinsic', line, '', [], [], [])
+
+	(mn, operands) = parse_asm_line(line)
+	if len(operands) == 0: return('asm', mn, '', [], [], [])
+	cls = operand_class(operands[0])
+	regs = [extract_registers(x) for x in operands]
+	if mn.startswith('st') or re.match(r'^(b|bc?\.\w+|bl|br|blr|cbn?z|tbn?z|ret)$', mn) != None or mn in ['cmp', 'cmn', 'tst', 'fcmp', 'fcmpe', 'prfm']:
+		(dsts, srcs) = ([], sum(regs, []))
+	elif re.match(r'^ld(n?p|psw|a?xp)$', mn) != None:
+		(dsts, srcs) = (regs[0] + sum(regs[1:2], []), sum(regs[2:], []))
+	else:
+		(dsts, srcs) = (regs[0], sum(regs[1:], []))
+	wb = [regs[k][0] for k, x in enumerate(operands) if x.startswith('[') and len(regs[k]) > 0 and (x.endswith('!') or k + 1 < len(operands))]
+	return('asm', mn, cls, dsts, srcs, wb)
+
+def analyze_insns(filename, uarch, src = sys.stdin, verbose = False, delta = None):
+	db = open_timing_db(filename, delta)
+	if db == None: return(None)
+	if uarch not in db.uarchs():
+		error('no latency table for --uarch={}, one of {}'.format(uarch, db.uarchs()))
+		db.close()
+		return(None)
+
+	# pick the record of the class that matches to operands, then the slowest row of the record (conservative).
+	# no fallback to another class; general-purpose forms of ops that also have simd intrinsics have no table
+	# in the split database, and resolving `add x0, x0, #16` to the simd `add` gives wrong latency and pipes
+	@functools.lru_cache(maxsize = None)
+	def resolve(kind, name, cls):
+		insns = db.lookup(uarch, kind, name)
+		if cls != '': insns = [x for x in insns if x[1]['bf']['ic'] in cls.split(',')]
+		if len(insns) == 0: return(None)
+		(i, insn) = insns[0]
+		rows = [r for r in insn['tb'][uarch] if r['nl'] != None]
+		if len(rows) == 0: return(None)
+		return(i, insn['bf']['op'], max(rows, key = lambda r: (r['nl'][1], r['nr'][1] if r['nr'] != None else 0)))
+
+	insns = []
+	unresolved = []
+	for n, line in enumerate(src):
+		parsed = parse_analyze_line(line)
+		if parsed == None: continue
+		(kind, name, cls, dsts, srcs, wbs) = parsed
+		r = resolve(kind, name, cls)
+		if r == None:
+			unresolved.append((n + 1, line.strip(' \t\r\n')))
+			continue
+		(i, op, row) = r
+		# accumulator operand is the destination register for asm, and the first argument for intrinsics
+		accs = []
+		if 'nf' in row or canonize_opcode(op) in acc_opcodes:
+			(accs, srcs) = (dsts[:1], srcs) if kind == 'asm' else (srcs[:1], srcs[1:])
+		insns.append((n + 1, name, i, row, dsts, srcs, accs, wbs))
+
+	# dependency chain; accumulator operands (the destination of mla and so on) use late-forward latency if available.
+	# the sequence is traversed twice, and the loop-carried latency is the largest growth of a register between the
+	# passes (not of the whole path, which hides carried chains shorter than a chain local to an iteration).
+	# written-back base registers are ready a cycle after issue, as the update is done apart from the access
+	def traverse(ready, timeline):
+		for (n, name, i, row, dsts, srcs, accs, wbs) in insns:
+			start = max([ready.get(x, 0.0) for x in srcs] + [0.0])
+			end = start + row['nl'][1]
+			for x in accs:
+				end = max(end, ready.get(x, 0.0) + row.get('nf', row['nl'][1]))
+			for x in dsts: ready[x] = end
+			for x in wbs: ready[x] = start + 1.0
+			if timeline != None: timeline.append((n, name, start, end))
+		return(max(list(ready.values()) + [0.0]))
+
+	timeline = []
+	ready = dict()
+	cp = traverse(ready, timeline)
+	first = dict(ready)
+	traverse(ready, None)
+
+	# per-pipe pressure; comma-separated pipe groups are all occupied for the reciprocal throughput, and a group is issued
+	# to any of its pipes. a pipe without index (`V`) stands for all the indexed pipes of the name in the table (`V0`, `V1`).
+	# the pressure of a set of pipes is the work of the groups that fit in the set, spread over the pipes of the set
+	known = db.pipes(uarch)
+	def expand_pipe(p):
+		indexed = sorted([x for x in known if re.match(r'^' + re.escape(p) + r'\d+$', x) != None])
+		return(indexed if re.match(r'^[a-z]+$', p) != None and len(indexed) > 0 else [p])
+
+	work = dict()
+	for (n, name, i, row, dsts, srcs, accs, wbs) in insns:
+		rt = row['nr'][1] if row['nr'] != None else 1.0
+		for g in row['np']:
+			k = tuple(sorted(set(sum([expand_pipe(p) for p in g], []))))
+			work[k] = work.get(k, 0.0) + rt * len(k)
+	pressure = dict([('/'.join(k), sum([w for e, w in work.items() if set(e) <= set(k)]) / len(k)) for k in work])
+
+	recurrence = max([ready[x] - first[x] for x in first] + [0.0])
+	bottleneck = max(pressure.items(), key = lambda x: x[1]) if len(pressure) > 0 else ('-', 0.0)
+	bound = max(bottleneck[1], recurrence)
+
+	print('uarch:                  {}'.format(uarch))
+	print('instructions:           {} (unresolved {})'.format(len(insns) + len(unresolved), len(unresolved)))
+	print('critical path latency:  {:g} cycles'.format(cp))
+	print('loop-carried latency:   {:g} cycles / iteration'.format(recurrence))
+	print('throughput bound:       {:.2f} cycles / iteration ({})'.format(bound, 'dependency' if recurrence >= bottleneck[1] else 'pipe ' + bottleneck[0]))
+	print('pipe pressure (cycles / iteration):')
+	for k, v in sorted(pressure.items(), key = lambda x: -x[1]):
+		print('  {:<12s} {:8.2f}'.format(k, v))
+	if verbose:
+		print('timeline (line, instruction, issue, complete):')
+		for (n, name, start, end) in timeline:
+			print('  {:6d} {:<16s} {:8g} {:8g}'.format(n, name, start, end))
+	for (n, line) in unresolved:
+		print('unresolved: line {}: {}'.format(n, line))
+	db.close()
+	return(True)
+
+
+
+
+# binary index memory-mapped by the query command; layout (little endian):
+#   header:  magic 'OPA64IX1', u32 number of keys, u32 number of records, u64 offsets to keys, pool, records, and blobs
+#   keys:    (u32 offset in pool, u16 length, u32 record id) for each key, sorted by key string
+#   pool:    key strings in utf-8
+#   records: (u64 offset in blobs, u32 length) for each record
+#   blobs:   compact json for each record, with the brief description and tables inlined
+index_magic  = b'OPA64IX1'
+index_header = struct.Struct('<8sIIQQQQ')
+index_key    = struct.Struct('<IHI')
+index_rec    = struct.Struct('<QI')
+
+def extract_query_keys(bf):
+	asms = bf['as'] if type(bf.get('as')) is list else [bf.get('as', '')]
+	m = re.search(r'(\w+)\s*\(', bf['it'])
+	keys = [bf['op'], canonize_opcode(bf['op'])] + [x.split(' ')[0] for x in asms if x != ''] + ([m.group(1)] if m != None else [])
+	return(sorted(set([x.lower() for x in keys if x != ''])))
+
+def write_index(db, filename):
+	(keys, blobs) = ([], [])
+	for i, insn in enumerate(db['insns']):
+		bf = insn['bf']
+		tb = dict([(arch, [[r['vr'], r['lt'], r['tp'], r['ip'], r['pp']] for r in rows]) for arch, rows in insn['tb'].items()]) if len(insn['tb']) > 0 else {}
+		rec = { 'op': bf['op'], 'it': bf['it'], 'ic': bf['ic'], 'ft': bf['ft'], 'bf': db['descs'][insn['ds']]['bf'], 'tb': tb }
+		blobs.append(json.dumps(rec, separators = (',', ':')).encode('UTF-8'))
+		keys.extend([(k.encode('UTF-8'), i) for k in extract_query_keys(bf)])
+	keys.sort()
+
+	(pool, key_entries) = (bytearray(), bytearray())
+	for k, i in keys:
+		key_entries += index_key.pack(len(pool), len(k), i)
+		pool += k
+	(blob, rec_entries) = (bytearray(), bytearray())
+	for b in blobs:
+		rec_entries += index_rec.pack(len(blob), len(b))
+		blob += b
+
+	keys_off = index_header.size
+	pool_off = keys_off + len(key_entries)
+	recs_off = pool_off + len(pool)
+	blob_off = recs_off + len(rec_entries)
+	with open(filename, 'wb') as f:
+		f.write(index_header.pack(index_magic, len(keys), len(blobs), keys_off, pool_off, recs_off, blob_off))
+		for x in [key_entries, pool, rec_entries, blob]: f.write(x)
+	return(None)
+
+class QueryIndex:
+	def __init__(self, filename):
+		self.f  = open(filename, 'rb')
+		self.mm = mmap.mmap(self.f.fileno(), 0, access = mmap.ACCESS_READ)
+		(magic, self.nkeys, self.nrecs, self.keys_off, self.pool_off, self.recs_off, self.blob_off) = index_header.unpack_from(self.mm, 0)
+		if magic != index_magic: raise ValueError('not an opa64 index: {}'.format(filename))
+
+	def key_at(self, k):
+		(off, length, i) = index_key.unpack_from(self.mm, self.keys_off + k * index_key.size)
+		return(self.mm[self.pool_off + off:self.pool_off + off + length], i)
+
+	def record_at(self, i):
+		(off, length) = index_rec.unpack_from(self.mm, self.recs_off + i * index_rec.size)
+		return(json.loads(self.mm[self.blob_off + off:self.blob_off + off + length]))
+
+	def lookup(self, term, prefix = False):
+		# binary search for the first key not less than the term, then scan while keys match
+		term = term.lower().encode('UTF-8')
+		(lo, hi) = (0, self.nkeys)
+		while lo < hi:
+			mid = (lo + hi) // 2
+			if self.key_at(mid)[0] < term: lo = mid + 1
+			else: hi = mid
+		ids = []
+		for k in range(lo, self.nkeys):
+			(key, i) = self.key_at(k)
+			if not (key.startswith(term) if prefix else key == term): break
+			if i not in ids: ids.append(i)
+		return(sorted(ids))
+
+	def close(self):
+		self.mm.close()
+		self.f.close()
+
+def query_insns(filename, terms, uarch = None, iclass = None):
+	index = QuerySqlite(filename) if is_sqlite(filename) else QueryIndex(filename)
+	for term in terms:
+		# trailing '*' for prefix match
+		(term, prefix) = (term[:-1], True) if term.endswith('*') else (term, False)
+		if len(terms) > 1: print('# {}'.format(term + ('*' if prefix else '')))
+		for i in index.lookup(term, prefix):
+			rec = index.record_at(i)
+			if iclass != None and rec['ic'] != iclass: continue
+			if uarch != None and uarch not in rec['tb']: continue
+			rows = sum([[(arch, r) for r in rows] for arch, rows in rec['tb'].items() if uarch == None or arch == uarch], [])
+			print('\t'.join([rec['op'], rec['ic'], rec['it'] if rec['it'] != '' else rec['bf']]))
+			for arch, (vr, lt, tp, ip, pp) in rows:
+				print('\t'.join(['', arch, ', '.join(vr), 'lt=' + lt, 'tp=' + tp, ip, 'p.{}'.format(pp)]))
+	index.close()
+	return(None)
+
+
+
+# sqlite storage of split database; records, descriptions, per-uarch timing rows, and feature macros are
+# normalized into tables, and opcodes, intrinsics, asm templates, and descriptions are indexed with fts5
+sqlite_magic  = b'SQLite format 3\x00'
+sqlite_schema = '''
+	create table metadata (key text primary key, value text);
+	create table descs (id integer primary key, brief text, description text, operation text);
+	create table records (
+		id integer primary key, op text, intrinsic text, iclass text, feature text, intr_page text,
+		ref text, equiv text, cond_setting text, macro text, desc_id integer references descs(id), keys text
+	);
+	create table asms (record_id integer references records(id), pos integer, asm text);
+	create table timings (
+		record_id integer references records(id), uarch text, pos integer, variant text, latency text, throughput text,
+		pipes text, page, lt_min real, lt_max real, lt_fwd real, rtp_min real, rtp_max real, pipe_sets text
+	);
+	create table macros (macro text primary key, feature text, page);
+	create index records_op on records(op);
+	create index asms_record on asms(record_id);
+	create index timings_record on timings(record_id);
+	create index timings_uarch on timings(uarch, lt_min);
+	create virtual table search using fts5(keys, intrinsic, asm, brief, description, content = '', tokenize = "unicode61 tokenchars '_.'");
+'''
+
+def is_sqlite(filename):
+	with open(filename, 'rb') as f: return(f.read(len(sqlite_magic)) == sqlite_magic)
+
+def write_sqlite(db, filename):
+	if os.path.exists(filename): os.remove(filename)
+	con = sqlite3.connect(filename)
+	con.executescript(sqlite_schema)
+	con.executemany('insert into metadata values (?, ?)', [(k, json.dumps(v)) for k, v in db['metadata'].items()])
+	con.executemany('insert into descs values (?, ?, ?, ?)', [(i, d['bf'], d['dt'], d['or']) for i, d in enumerate(db['descs'])])
+
+	macros = dict()
+	for i, insn in enumerate(db['insns']):
+		bf = insn['bf']
+		asms = bf['as'] if type(bf.get('as')) is list else ([bf['as']] if 'as' in bf else [])
+		mc = bf.get('mc', None)
+		if mc != None: macros[mc['macro']] = (mc['macro'], bf['ft'], mc['page'])
+		con.execute('insert into records values (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', (
+			i, bf['op'], bf['it'], bf['ic'], bf['ft'], bf.get('ip'), bf.get('rf'), bf.get('eq'), bf.get('cs'),
+			mc['macro'] if mc != None else None, insn['ds'], ' '.join(extract_query_keys(bf))
+		))
+		con.executemany('insert into asms values (?, ?, ?)', [(i, j, x) for j, x in enumerate(asms)])
+		for arch, rows in (insn['tb'].items() if len(insn['tb']) > 0 else []):
+			con.executemany('insert into timings values (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', [(
+				i, arch, j, json.dumps(r['vr']), r['lt'], r['tp'], r['ip'], r['pp'],
+				r['nl'][0] if r['nl'] != None else None, r['nl'][1] if r['nl'] != None else None, r.get('nf'),
+				r['nr'][0] if r['nr'] != None else None, r['nr'][1] if r['nr'] != None else None, json.dumps(r['np'])
+			) for j, r in enumerate(rows)])
+		ds = db['descs'][insn['ds']]
+		con.execute('insert into search (rowid, keys, intrinsic, asm, brief, description) values (?, ?, ?, ?, ?, ?)',
+			(i, ' '.join(extract_query_keys(bf)), bf['it'], ' '.join(asms), ds['bf'], ds['dt']))
+	con.executemany('insert into macros values (?, ?, ?)', list(macros.values()))
+	con.commit()
+	con.close()
+	return(None)
+
+def read_sqlite_record(con, i):
+	(op, it, ic, ft, ip, rf, eq, cs, macro, desc_id) = con.execute(
+		'select op, intrinsic, iclass, feature, intr_page, ref, equiv, cond_setting, macro, desc_id from records where id = ?', (i,)).fetchone()
+	bf = { 'ic': ic, 'ft': ft, 'op': op, 'it': it }
+	for k, v in [('ip', ip), ('rf', rf), ('eq', eq), ('cs', cs)]:
+		if v != None: bf[k] = v
+	if macro != None:
+		(page,) = con.execute('select page from macros where macro = ?', (macro,)).fetchone()
+		bf['mc'] = { 'macro': macro, 'page': page }
+	asms = [x[0] for x in con.execute('select asm from asms where record_id = ? order by pos', (i,))]
+	if len(asms) > 0: bf['as'] = asms
+
+	tb = dict()
+	for (arch, vr, lt, tp, pipes, pp, lt_min, lt_max, lt_fwd, rtp_min, rtp_max, np) in con.execute(
+			'select uarch, variant, latency, throughput, pipes, page, lt_min, lt_max, lt_fwd, rtp_min, rtp_max, pipe_sets from timings where record_id = ? order by uarch, pos', (i,)):
+		row = {
+			'vr': json.loads(vr), 'lt': lt, 'tp': tp, 'ip': pipes, 'pp': pp,
+			'nl': [lt_min, lt_max] if lt_min != None else None,
+			'nr': [rtp_min, rtp_max] if rtp_min != None else None,
+			'np': json.loads(np)
+		}
+		if lt_fwd != None: row['nf'] = lt_fwd
+		tb.setdefault(arch, []).append(row)
+	return({ 'bf': bf, 'ds': desc_id, 'tb': tb })
+
+def read_sqlite(filename):
+	con = sqlite3.connect(filename)
+	meta = dict([(k, json.loads(v)) for k, v in con.execute('select key, value from metadata')])
+	descs = [{ 'bf': b, 'dt': d, 'or': o } for (b, d, o) in con.execute('select brief, description, operation from descs order by id')]
+	insns = [read_sqlite_record(con, i) for (i,) in con.execute('select id from records order by id').fetchall()]
+	con.close()
+	return({ 'metadata': meta, 'descs': descs, 'insns': insns })
+
+class QuerySqlite:
+	# same interface as QueryIndex, answered by the fts5 index
+	def __init__(self, filename):
+		self.con = sqlite3.connect(filename)
+
+	def lookup(self, term, prefix = False):
+		q = 'keys : "{}"{}'.format(term.lower().replace('"', '""'), ' *' if prefix else '')
+		ids = [x[0] for x in self.con.execute('select rowid from search where search match ? order by rowid', (q,))]
+		if prefix: return(ids)
+		return([i for i in ids if term.lower() in self.con.execute('select keys from records where id = ?', (i,)).fetchone()[0].split(' ')])
+
+	def record_at(self, i):
+		(op, it, ic, ft, brief) = self.con.execute(
+			'select op, intrinsic, iclass, feature, brief from records join descs on records.desc_id = descs.id where records.id = ?', (i,)).fetchone()
+		tb = dict()
+		for (arch, vr, lt, tp, ip, pp) in self.con.execute(
+				'select uarch, variant, latency, throughput, pipes, page from timings where record_id = ? order by uarch, pos', (i,)):
+			tb.setdefault(arch, []).append([json.loads(vr), lt, tp, ip, pp])
+		return({ 'op': op, 'it': it, 'ic': ic, 'ft': ft, 'bf': brief, 'tb': tb })
+
+	def close(self):
+		self.con.close()
+
+class TimingSqlite:
+	# same interface as TimingDb; the fastest rows are picked by range scans on timings(uarch, lt_min), and
+	# analyze reads only the records found by the fts5 index for each mnemonic
+	fastest_rows = '''
+		select record_id, lt_min, rtp_max from (
+			select record_id, lt_min, rtp_max, row_number() over (partition by record_id order by lt_min, coalesce(rtp_min, 0), pos) as k
+			from timings where uarch = ? and lt_min is not null{}
+		) where k = 1'''
+
+	def __init__(self, filename):
+		self.query = QuerySqlite(filename)
+		self.con = self.query.con
+
+	def uarchs(self):
+		return([x[0] for x in self.con.execute('select distinct uarch from timings where lt_min is not null order by uarch')])
+
+	def within(self, arch, max_latency = None):
+		if max_latency == None:
+			return(set([x[0] for x in self.con.execute('select distinct record_id from timings where uarch = ? and lt_min is not null', (arch,))]))
+		return(set([x[0] for x in self.con.execute('select distinct record_id from timings where uarch = ? and lt_min <= ?', (arch, max_latency))]))
+
+	def timings(self, arch, ids = None):
+		if ids == None:
+			return(dict([(i, (lt, rt)) for (i, lt, rt) in self.con.execute(self.fastest_rows.format(''), (arch,))]))
+		# in chunks, as the number of bound parameters is limited
+		(ids, ret) = (sorted(ids), dict())
+		for k in range(0, len(ids), 500):
+			chunk = ids[k:k + 500]
+			q = self.fastest_rows.format(' and record_id in ({})'.format(', '.join(['?'] * len(chunk))))
+			ret.update(dict([(i, (lt, rt)) for (i, lt, rt) in self.con.execute(q, [arch] + chunk)]))
+		return(ret)
+
+	def describe(self, i):
+		(op, it, brief) = self.con.execute(
+			'select op, intrinsic, brief from records join descs on records.desc_id = descs.id where records.id = ?', (i,)).fetchone()
+		return(op, it if it != '' else brief)
+
+	def lookup(self, uarch, kind, name):
+		# the fts5 keys hold opcodes, canonized opcodes, asm mnemonics, and intrinsic names, so the candidates are
+		# narrowed down there, then matched in the same way as TimingDb
+		keys = [name] if kind == 'intrinsic' else [name, canonize_opcode(name)]
+		ids = sorted(set(sum([self.query.lookup(k) for k in keys], [])))
+		insns = [(i, read_sqlite_record(self.con, i)) for i in ids]
+		ids = find_in_lookup(build_insn_lookup(insns, uarch), kind, name)
+		insns = dict(insns)
+		return([(i, insns[i]) for i in ids])
+
+	def pipes(self, uarch):
+		sets = [json.loads(x[0]) for x in self.con.execute('select distinct pipe_sets from timings where uarch = ?', (uarch,))]
+		return(set([p for np in sets for g in np for p in g]))
+
+	def close(self):
+		self.query.close()
+
+
+
+# scheduling model export; pipe names differ between guides (`S` is the store pipe in A57 / A72 but a
+# single-cycle integer pipe in A76 and later), so they are mapped to common unit names, keeping pipe indices
+pipe_units = {
+	'default': {
+		'b': 'branch', 'i': 'int', 's': 'int', 'm': 'int-multi', 'l': 'load', 'd': 'store-data', 'v': 'fp-simd', 'f': 'fp-simd',
+		'alu': 'int', 'mac': 'int-multi', 'div': 'int-multi', 'ld': 'load', 'st': 'store', 'fp': 'fp-simd', 'neon': 'fp-simd'
+	},
+	'a57': { 's': 'store' },
+	'a72': { 's': 'store' }
+}
+
+def normalize_pipe_name(uarch, pipe):
+	m = re.match(r'^([a-z]+?)(\d*)$', pipe)
+	if m == None: return('other-' + pipe)
+	(base, n) = (m.group(1), m.group(2))
+	units = dict(pipe_units['default'], **pipe_units.get(uarch, {}))
+	return(units[base] + n if base in units else 'other-' + pipe)
+
+def export_sched(filename, uarch, delta = None):
+	db = load_db(filename, delta)
+	if db == None: return(None)
+	if uarch not in db['index']:
+		error('no latency table for --uarch={}, one of {}'.format(uarch, list(db['index'].keys())))
+		return(None)
+	pdf = db['metadata'].get('path', {}).get('table', {}).get(uarch, '')
+
+	# rows shared by records (intrinsics of the same instruction) are merged into one form
+	forms = dict()
+	units = dict()
+	for insn in db['insns']:
+		if len(insn['tb']) == 0 or uarch not in insn['tb']: continue
+		bf = insn['bf']
+		asms = bf['as'] if type(bf.get('as')) is list else ([bf['as']] if 'as' in bf else [])
+		for r in insn['tb'][uarch]:
+			key = json.dumps([bf['op'], bf['ic'], r['vr'], r['lt'], r['tp'], r['ip'], r['pp']])
+			if key not in forms:
+				for p in sum(r['np'], []): units[p] = normalize_pipe_name(uarch, p)
+				forms[key] = {
+					'opcode':      bf['op'],
+					'class':       bf['ic'],
+					'variant':     r['vr'],
+					'asm':         [],
+					'intrinsics':  [],
+					'latency':     { 'min': r['nl'][0], 'max': r['nl'][1], 'forward': r.get('nf') } if r['nl'] != None else None,
+					'rthroughput': { 'min': r['nr'][0], 'max': r['nr'][1] } if r['nr'] != None else None,
+					'pipes':       [sorted(set([normalize_pipe_name(uarch, p) for p in g])) for g in r['np']],
+					'raw':         { 'latency': r['lt'], 'throughput': r['tp'], 'pipes': r['ip'] },
+					'source':      { 'pdf': pdf, 'page': r['pp'], 'link': '{}#page={}'.format(pdf, r['pp']) }
+				}
+			f = forms[key]
+			f['asm'] += [x for x in asms if x not in f['asm']]
+			m = re.search(r'(\w+)\s*\(', bf['it'])
+			if m != None and m.group(1) not in f['intrinsics']: f['intrinsics'].append(m.group(1))
+
+	return({
+		'uarch':   uarch,
+		'release': db['metadata'].get('release', 'unknown'),
+		'units':   dict(sorted(units.items())),
+		'forms':   sorted(forms.values(), key = lambda x: (x['opcode'], x['class'], x['variant']))
+	})
+
+
+
+# load test of the server started by `make start` (or the docker entrypoint); each client repeats a session of
+# the page load, a cold database load, pdf page fetches (range requests, as pdf viewers do for `#page=`),
+# and search queries, which run in the browser and are thus replayed here against the fetched database.
+# servers ignoring `Range` (http.server of `make start`) return the whole pdf, reported as `pdf-full`
+def percentile(xs, p):
+	if len(xs) == 0: return(0.0)
+	xs = sorted(xs)
+	return(xs[min(len(xs) - 1, max(0, int(math.ceil(p / 100.0 * len(xs))) - 1))])
+
+def search_db(db, word):
+	# same as findKey in opv86.js
+	def match(insn):
+		bf = insn['bf']
+		if any([word in bf[k] for k in ['ic', 'ft', 'op', 'it']]): return(True)
+		if 'as' in bf and word in bf['as']: return(True)
+		ds = db['descs'][insn['ds']]
+		return(word in ds['bf'].lower() or word in ds['dt'].lower())
+	return([i for i, insn in enumerate(db['insns']) if match(insn)])
+
+def load_test(url, levels = [1, 4, 16], duration = 10.0, queries = ['add', 'vmlaq', 'ld1', 'fmla', 'sha', 'saturating']):
+	import urllib.request
+	import urllib.error
+	url = url.rstrip('/') + '/'
+
+	def fetch(path, headers = {}, method = 'GET'):
+		req = urllib.request.Request(url + path, headers = dict({ 'Cache-Control': 'no-cache' }, **headers), method = method)
+		with urllib.request.urlopen(req, timeout = 60) as r: return(r.status, r.headers, r.read())
+
+	# database and pdf paths are taken from the served database
+	db = json.loads(fetch('data/db.json')[2])
+	def collect_pdfs(e):
+		if type(e) is str: return([e] if e.endswith('.pdf') else [])
+		return(sum([collect_pdfs(v) for v in e.values()], []) if type(e) is dict else [])
+	pdfs = sorted(set(collect_pdfs(db['metadata'].get('path', {}))))
+	message('{} records, {} pdfs found in {}data/db.json'.format(len(db['insns']), len(pdfs), url))
+
+	# file sizes to pick range offsets in; pdfs failed or of unknown length are not fetched
+	sizes = dict()
+	for pdf in pdfs:
+		try:
+			sizes[pdf] = int(fetch(pdf, method = 'HEAD')[1].get('Content-Length', 0))
+		except (urllib.error.URLError, OSError):
+			sizes[pdf] = 0
+		if sizes[pdf] == 0: error('failed to get size of {}{}, skipped'.format(url, pdf))
+	pdfs = [x for x in pdfs if sizes[x] > 0]
+
+	def session(rng, samples):
+		def timed(kind, fn):
+			t = time.monotonic()
+			try:
+				(status, headers, body) = fn()
+				samples.append((kind + '-full' if kind == 'pdf' and status == 200 else kind, time.monotonic() - t, len(body), True))
+			except (urllib.error.URLError, OSError):
+				samples.append((kind, time.monotonic() - t, 0, False))
+		for path in ['index.html', 'opv86.css', 'jquery.min.js', 'opv86.js']: timed('page', lambda: fetch(path))
+		timed('db', lambda: fetch('data/db.json'))
+		for pdf in (rng.sample(pdfs, min(2, len(pdfs))) if len(pdfs) > 0 else []):
+			offset = rng.randrange(0, sizes[pdf], 65536)
+			timed('pdf', lambda: fetch(pdf, { 'Range': 'bytes={}-{}'.format(offset, min(offset + 65535, sizes[pdf] - 1)) }))
+
+	def worker(seed, deadline, samples):
+		rng = random.Random(seed)
+		while time.monotonic() < deadline: session(rng, samples)
+
+	print('concurrency\tkind\trequests\terrors\treq/s\tMB/s\tp50 ms\tp90 ms\tp99 ms\tmax ms')
+	for level in levels:
+		samples = []
+		deadline = time.monotonic() + duration
+		threads = [threading.Thread(target = worker, args = (i, deadline, samples)) for i in range(level)]
+		t = time.monotonic()
+		for th in threads: th.start()
+		for th in threads: th.join()
+		elapsed = time.monotonic() - t
+		for kind in ['page', 'db', 'pdf', 'pdf-full', 'all']:
+			xs = [x for x in samples if kind == 'all' or x[0] == kind]
+			lat = [x[1] * 1000.0 for x in xs if x[3]]
+			print('{}\t{}\t{}\t{}\t{:.1f}\t{:.2f}\t{:.1f}\t{:.1f}\t{:.1f}\t{:.1f}'.format(
+				level, kind, len(xs), len([x for x in xs if not x[3]]), len(xs) / elapsed, sum([x[2] for x in xs]) / elapsed / 1024 / 1024,
+				percentile(lat, 50), percentile(lat, 90), percentile(lat, 99), max(lat + [0.0])))
+
+	# search runs in the browser; measured once, independent of concurrency
+	lat = []
+	for q in queries:
+		t = time.monotonic()
+		search_db(db, q.lower())
+		lat.append((time.monotonic() - t) * 1000.0)
+	print('-\tsearch\t{}\t0\t{:.1f}\t-\t{:.1f}\t{:.1f}\t{:.1f}\t{:.1f}'.format(
+		len(lat), len(lat) / (sum(lat) / 1000.0), percentile(lat, 50), percentile(lat, 90), percentile(lat, 99), max(lat)))
+	return(None)
 
 
 
@@ -901,6 +2108,11 @@ if __name__ == '__main__':
 		help    = 'list of documents to fetch, one or more of [\'intrinsics\', \'table\', \'description\'], or \'all\' for everything',
 		default = []
 	)
+	fa.add_argument('--release',
+		action  = 'store',
+		help    = 'release of documents, one of {}'.format(list(releases.keys())),
+		default = release
+	)
 
 	pa = sub.add_parser('parse')
 	pa.set_defaults(func = parse_all)
@@ -914,6 +2126,43 @@ if __name__ == '__main__':
 		help    = 'list of documents to fetch, one or more of [\'intrinsics\', \'table\', \'description\'], or \'all\' for everything',
 		default = []
 	)
+	pa.add_argument('--release',
+		action  = 'store',
+		help    = 'release of documents, one of {}'.format(list(releases.keys())),
+		default = release
+	)
+	pa.add_argument('--no-cache',
+		action  = 'store_true',
+		help    = 'neither read nor write parsed results and rendered pages in \'<dir>/cache\''
+	)
+	pa.add_argument('--engine',
+		action  = 'store',
+		choices = list(pdf_engines.keys()),
+		help    = 'pdf table extraction engine',
+		default = pdf_engine
+	)
+
+	pa = sub.add_parser('compare')
+	pa.set_defaults(func = compare_engines)
+	pa.add_argument('--dir',
+		action  = 'store',
+		help    = 'working directory where downloaded documents are saved',
+		default = '.'
+	)
+	pa.add_argument('--doc',
+		action  = 'append',
+		help    = 'list of documents to compare, one or more of [\'intrinsics\', \'table\', \'macros\'], or \'all\' for everything',
+		default = []
+	)
+	pa.add_argument('--release',
+		action  = 'store',
+		help    = 'release of documents, one of {}'.format(list(releases.keys())),
+		default = release
+	)
+	pa.add_argument('--no-cache',
+		action  = 'store_true',
+		help    = 'do not use rendered pages in \'<dir>/cache\' for camelot'
+	)
 
 	pa = sub.add_parser('split')
 	pa.set_defaults(func = split_insns)
@@ -922,15 +2171,248 @@ if __name__ == '__main__':
 		help    = 'json object generated by \'opa64.py parse --doc=all\'',
 		default = ''
 	)
+	pa.add_argument('--index',
+		action  = 'store',
+		help    = 'path to binary index for \'opa64.py query\', not generated if omitted',
+		default = None
+	)
+	pa.add_argument('--format',
+		action  = 'store',
+		choices = ['json', 'sqlite'],
+		help    = 'output format, json to stdout or sqlite database to --out',
+		default = 'json'
+	)
+	pa.add_argument('--out',
+		action  = 'store',
+		help    = 'output path for --format=sqlite',
+		default = None
+	)
+
+	pa = sub.add_parser('delta')
+	pa.set_defaults(func = build_delta)
+	pa.add_argument('--base',
+		action  = 'store',
+		help    = 'json object generated by \'opa64.py split\' for the base release',
+		default = ''
+	)
+	pa.add_argument('--db',
+		action  = 'store',
+		help    = 'json object generated by \'opa64.py split\' for the new release',
+		default = ''
+	)
+	pa.add_argument('--release',
+		action  = 'store',
+		help    = 'name of the new release, taken from metadata of --db if omitted',
+		default = None
+	)
+	pa.add_argument('--manifest',
+		action  = 'store',
+		help    = 'releases.json for the front-end, updated with the new release if given',
+		default = None
+	)
+
+	pa = sub.add_parser('regress')
+	pa.set_defaults(func = regress_split)
+	pa.add_argument('--db',
+		action  = 'store',
+		help    = 'frozen json object generated by \'opa64.py parse --doc=all\'',
+		default = ''
+	)
+	pa.add_argument('--golden',
+		action  = 'store',
+		help    = 'json object generated by \'opa64.py split\' from the same --db, compared record by record',
+		default = ''
+	)
+	pa.add_argument('--baseline',
+		action  = 'store',
+		help    = 'json file keeping stage timings and cascade levels of the reference run',
+		default = None
+	)
+	pa.add_argument('--budget',
+		action  = 'append',
+		help    = 'time and memory budget of a stage, in \'<stage>=<seconds>[:<megabytes>]\' where stage is one of [\'load\', \'split\', \'sort\', \'intern\', \'index\']',
+		default = []
+	)
+	pa.add_argument('--update',
+		action  = 'store_true',
+		help    = 'overwrite --baseline with the result of this run'
+	)
+
+	pa = sub.add_parser('export-sched')
+	pa.set_defaults(func = export_sched)
+	pa.add_argument('--db',
+		action  = 'store',
+		help    = 'json object generated by \'opa64.py split\'',
+		default = ''
+	)
+	pa.add_argument('--uarch',
+		action  = 'store',
+		help    = 'target uarch, one of [\'a78\', \'a77\', \'a76\', \'n1\', \'a75\', \'a72\', \'a57\', \'a55\']',
+		default = 'n1'
+	)
+	pa.add_argument('--delta',
+		action  = 'store',
+		help    = 'delta generated by \'opa64.py delta\' to switch --db to another release',
+		default = None
+	)
+
+	pa = sub.add_parser('loadtest')
+	pa.set_defaults(func = load_test)
+	pa.add_argument('--url',
+		action  = 'store',
+		help    = 'root of the server started by \'make start\'',
+		default = 'http://localhost:8080/'
+	)
+	pa.add_argument('--concurrency',
+		action  = 'store',
+		help    = 'comma-separated list of number of concurrent clients',
+		default = '1,4,16'
+	)
+	pa.add_argument('--duration',
+		action  = 'store',
+		type    = float,
+		help    = 'seconds to run at each concurrency level',
+		default = 10.0
+	)
+
+	pa = sub.add_parser('select')
+	pa.set_defaults(func = select_insns)
+	pa.add_argument('--db',
+		action  = 'store',
+		help    = 'json object generated by \'opa64.py split\'',
+		default = ''
+	)
+	pa.add_argument('--uarch',
+		action  = 'store',
+		help    = 'comma-separated list of uarchs to compare, such as \'n1,a78\'',
+		default = ''
+	)
+	pa.add_argument('--latency',
+		action  = 'store',
+		type    = float,
+		help    = 'select records whose latency is equal to or less than the value on all of --uarch',
+		default = None
+	)
+	pa.add_argument('--slower',
+		action  = 'store',
+		help    = 'select records that got slower from the former to the latter, such as \'a76:a78\'',
+		default = None
+	)
+	pa.add_argument('--delta',
+		action  = 'store',
+		help    = 'delta generated by \'opa64.py delta\' to switch --db to another release',
+		default = None
+	)
+
+	pa = sub.add_parser('analyze')
+	pa.set_defaults(func = analyze_insns)
+	pa.add_argument('--db',
+		action  = 'store',
+		help    = 'json object generated by \'opa64.py split\'',
+		default = ''
+	)
+	pa.add_argument('--uarch',
+		action  = 'store',
+		help    = 'target uarch, one of [\'a78\', \'a77\', \'a76\', \'n1\', \'a75\', \'a72\', \'a57\', \'a55\']',
+		default = 'n1'
+	)
+	pa.add_argument('--input',
+		action  = 'store',
+		help    = 'file containing assembly or intrinsics, one instruction per line (stdin if omitted)',
+		default = None
+	)
+	pa.add_argument('--verbose',
+		action  = 'store_true',
+		help    = 'print issue and completion cycles of each instruction'
+	)
+	pa.add_argument('--delta',
+		action  = 'store',
+		help    = 'delta generated by \'opa64.py delta\' to switch --db to another release',
+		default = None
+	)
+
+	pa = sub.add_parser('query')
+	pa.set_defaults(func = query_insns)
+	pa.add_argument('term',
+		nargs   = '?',
+		help    = 'opcode, mnemonic, or intrinsic name to look up; trailing \'*\' for prefix match',
+		default = None
+	)
+	pa.add_argument('--index',
+		action  = 'store',
+		help    = 'binary index generated by \'opa64.py split --index\', or sqlite database by \'opa64.py split --format=sqlite\'',
+		default = 'data/db.idx'
+	)
+	pa.add_argument('--uarch',
+		action  = 'store',
+		help    = 'show latency table only for the uarch',
+		default = None
+	)
+	pa.add_argument('--class',
+		action  = 'store',
+		dest    = 'iclass',
+		help    = 'show only instructions in the class, one of [\'general\', \'advsimd\', \'fpsimd\', \'float\', \'sve\', \'system\']',
+		default = None
+	)
+	pa.add_argument('--batch',
+		action  = 'store_true',
+		help    = 'read terms from stdin, one per line'
+	)
 
 	args = ap.parse_args()
+	if args.func == export_sched:
+		ret = args.func(args.db, args.uarch, args.delta)
+		if ret == None: exit(1)
+		print(json.dumps(ret))
+		exit()
+
+	if args.func == load_test:
+		args.func(args.url, [int(x) for x in args.concurrency.split(',')], args.duration)
+		exit()
+
+	if args.func == regress_split:
+		exit(0 if args.func(args.db, args.golden, args.baseline, args.budget, args.update) else 1)
+
+	if args.func == query_insns:
+		if args.term == None and not args.batch:
+			error('term is required unless --batch is given')
+			exit(1)
+		terms = [x.strip(' \t\r\n') for x in sys.stdin] if args.batch else [args.term]
+		args.func(args.index, [x for x in terms if x != None and x != ''], args.uarch, args.iclass)
+		exit()
+
+	if args.func == analyze_insns:
+		with (open(args.input) if args.input != None else sys.stdin) as f:
+			exit(0 if args.func(args.db, args.uarch, f, args.verbose, args.delta) else 1)
+
+	if args.func == select_insns:
+		exit(0 if args.func(args.db, [x for x in args.uarch.split(',') if x != ''], args.latency, args.slower, args.delta) else 1)
+
 	if args.func == split_insns:
+		if args.format == 'sqlite' and args.out == None:
+			error('--out is required for --format=sqlite')
+			exit(1)
 		ret = args.func(args.db)
+		if args.index != None: write_index(ret, args.index)
+		if args.format == 'sqlite':
+			write_sqlite(ret, args.out)
+			exit()
 		print(json.dumps(ret))
 		exit()
 
+	if args.func == build_delta:
+		print(json.dumps(args.func(args.base, args.db, args.release, args.manifest)))
+		exit()
+
+	if args.release not in releases:
+		error('unknown release: --release={}, one of {}'.format(args.release, list(releases.keys())))
+		exit(1)
+	(release, urls) = (args.release, releases[args.release])
+	cache_dir = '/'.join([args.dir, 'cache']) if args.func in [parse_all, compare_engines] and not args.no_cache else None
+	if args.func == parse_all: pdf_engine = args.engine
+
 	if args.doc == [] or args.doc[0] == 'all': args.doc = build_doc_list()
-	if not os.path.exists(args.dir): os.makedirs(args.dir)
+	if args.func != compare_engines and not os.path.exists(args.dir): os.makedirs(args.dir)
 
 	ret = args.func(args.doc, args.dir)
 	if ret != None: print(json.dumps(ret))
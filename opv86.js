@@ -10,22 +10,43 @@
  */
 var _windowHeight;
 var _metadata;
+var _descs;
+var _timing;
+var _base;
+var _deltas = {};
+
+// rendered detail panels, keyed by record id (index in _original), kept across filter changes
+var _detailsCacheSize = 256;
+var _detailsCache = new Map();
+var _intlCache = new Map();
 var _original;
 var _filtered;
 
 
-function highlightIntl(cls, intr_str) {
-  var s = $("<div>").addClass(cls);
-  if(intr_str.length == 0) { return(s); }
+function splitIntl(intr_str) {
+  // (type, name + delimiter) pairs; memoized as the same declarations are rendered again on every filter change
+  var pairs = _intlCache.get(intr_str);
+  if(pairs !== undefined) { return(pairs); }
 
   var parts  = intr_str.split(/[(),]+/).filter(function (x) { return(x != ""); });
   var delims = Array(parts.length).fill(', ');
   delims[0]  = '(';
   delims[parts.length - 1] = ');';
-  parts.forEach(function (x, i) {
-    y = parts[i].trim().split(' ');
-    s.append($("<span>").addClass("opv86-code-type").text(y[0] + ' '));
-    s.append($("<span>").addClass("opv86-code-base").text(y[1] + delims[i]));
+  pairs = parts.map(function (x, i) {
+    var y = x.trim().split(' ');
+    return([y[0] + ' ', y[1] + delims[i]]);
+  });
+  _intlCache.set(intr_str, pairs);
+  return(pairs);
+}
+
+function highlightIntl(cls, intr_str) {
+  var s = $("<div>").addClass(cls);
+  if(intr_str.length == 0) { return(s); }
+
+  splitIntl(intr_str).forEach(function (y) {
+    s.append($("<span>").addClass("opv86-code-type").text(y[0]));
+    s.append($("<span>").addClass("opv86-code-base").text(y[1]));
   });
   return(s);
 }
@@ -113,19 +134,25 @@ function createSynopsis(op) {
   return(h.append(b));
 }
 
+function getDesc(op) {
+  return(_descs[op.ds]);
+}
+
 function createDescription(op) {
-  if(op.ds.dt.length == 0) { return(undefined); }
+  var ds = getDesc(op);
+  if(ds.dt.length == 0) { return(undefined); }
   var s = $("<div>").addClass("opv86-details-section").text("Description");
-  s.append($("<div>").addClass("opv86-details-body").text(op.ds.dt));
+  s.append($("<div>").addClass("opv86-details-body").text(ds.dt));
   return(s);
 }
 
 function createOperation(op) {
-  if(op.ds.or.length == 0) { return(undefined); }
+  var ds = getDesc(op);
+  if(ds.or.length == 0) { return(undefined); }
   var s = $("<div>").addClass("opv86-details-section").text("Operation");
   var c = $("<div>").addClass("opv86-details-body");
   var t = $("<div>").addClass("opv86-table-container");
-  t.append($("<div>").addClass("opv86-details-pseudocode").text(op.ds.or));
+  t.append($("<div>").addClass("opv86-details-pseudocode").text(ds.or));
   c.append(t);
   s.append(c);
   return(s);
@@ -210,14 +237,26 @@ function createHeader() {
   return(h);
 }
 
+function getDetails(id) {
+  // LRU; Map iterates in insertion order, so the first key is the least recently used
+  var d = _detailsCache.get(id);
+  if(d !== undefined) {
+    _detailsCache.delete(id);
+    _detailsCache.set(id, d);
+    return(d);
+  }
+  d = createDetails(_original[id], id);
+  _detailsCache.set(id, d);
+  if(_detailsCache.size > _detailsCacheSize) { _detailsCache.delete(_detailsCache.keys().next().value); }
+  return(d);
+}
+
 function setupOnClick(s) {
   s.click(function(e) {
     var p = $(this).parent();
     var d = p.find(".opv86-details-container");
     if(d.length == 0) {
-      var id = $(this)[0].id;
-      var op = _filtered[id];
-      d = createDetails(op, id);
+      d = getDetails(parseInt($(this)[0].id)).hide();
       p.append(d);
     }
     if(d.css("display") == "none") {
@@ -229,6 +268,17 @@ function setupOnClick(s) {
   return(s);
 }
 
+function setupOnHover(s) {
+  // render details in advance while the pointer stays on the row
+  var timer;
+  s.mouseenter(function(e) {
+    var id = parseInt($(this)[0].id);
+    timer = setTimeout(function () { getDetails(id); }, 100);
+  });
+  s.mouseleave(function(e) { clearTimeout(timer); });
+  return(s);
+}
+
 function findBackgroundColor(op) {
   var iclass  = op.bf.ic;
   var feature = op.bf.ft;
@@ -258,16 +308,16 @@ function createBrief(op, id) {
   s.append($("<div>").addClass("opv86-brief-text"));
   s.append(highlightIntl("opv86-brief-label", op.bf.it));
   s.append($("<div>").addClass("opv86-brief-text"));
-  s.append($("<div>").addClass("opv86-brief-text").text(op.ds.bf));
-  return(setupOnClick(s));
+  s.append($("<div>").addClass("opv86-brief-text").text(getDesc(op).bf));
+  return(setupOnHover(setupOnClick(s)));
 }
 
 
 function extendOplist(oplist, data, from, to) {
   if(to > data.length) { to = data.length; }
   for(var i = from; i < to; i++) {
-    var op = data[i];
-    var s = createBrief(op, i);
+    var id = data[i];
+    var s = createBrief(_original[id], id);
     var c = $("<div>").addClass("opv86-op-container").append(s);
     oplist.append(c);
   }
@@ -301,34 +351,132 @@ function findKey(op, filter_word) {
   var keys_opt = ["as"];
   for(var k of keys_opt) { if(k in op.bf && op.bf[k].indexOf(filter_word) != -1) { return(true); } }
 
-  if(op.ds.bf.toLowerCase().indexOf(filter_word) != -1) { return(true); }
-  if(op.ds.dt.toLowerCase().indexOf(filter_word) != -1) { return(true); }
+  var ds = getDesc(op);
+  if(ds.bf.toLowerCase().indexOf(filter_word) != -1) { return(true); }
+  if(ds.dt.toLowerCase().indexOf(filter_word) != -1) { return(true); }
   return(false);
 }
 
+function buildTiming(index) {
+  // uarch -> record id -> { lt: min latency, rt: reciprocal throughput } of the fastest row
+  var timing = {};
+  for(var arch in index) {
+    var c = index[arch];
+    timing[arch] = {};
+    c.id.forEach(function (id, i) { timing[arch][id] = { "lt": c.lt[i], "rt": c.rt[i] }; });
+  }
+  return(timing);
+}
+
+function parseTimingFilter(token) {
+  // "n1.lt<=2" compares with a constant, "a76.lt<a78.lt" compares two uarchs
+  var m = token.match(/^(\w+)\.(lt|rt)(<=|>=|<|>|=)(?:([0-9.]+)|(\w+)\.(lt|rt))$/);
+  if(m === null || !(m[1] in _timing)) { return(undefined); }
+  if(m[5] !== undefined && !(m[5] in _timing)) { return(undefined); }
+
+  var cmp = {
+    "<=": function (a, b) { return(a <= b); },
+    ">=": function (a, b) { return(a >= b); },
+    "<":  function (a, b) { return(a < b); },
+    ">":  function (a, b) { return(a > b); },
+    "=":  function (a, b) { return(a == b); }
+  }[m[3]];
+  return(function (id) {
+    var a = _timing[m[1]][id];
+    var b = m[5] === undefined ? { "v": parseFloat(m[4]) } : _timing[m[5]][id];
+    if(a === undefined || b === undefined) { return(false); }
+    var x = a[m[2]];
+    var y = m[5] === undefined ? b.v : b[m[6]];
+    return(x !== null && y !== null && cmp(x, y));
+  });
+}
+
 function rebuildOplist() {
   var oplist = $("#oplist");
+  oplist.find(".opv86-details-container").detach();    // keep cached panels from being cleaned up
   oplist.empty();
   oplist.append(createHeader());
 
   var clskeys = ["intrinsics-only", "general-only", "include-sve", "include-system"];
   var filter_cls = clskeys.filter(function (x) { return($("#" + x).is(':checked')); });
-  var filter_key = $("#filter-value").val().toLowerCase();
+  var filter_words = $("#filter-value").val().toLowerCase().split(/\s+/);
+  var filter_timing = filter_words.map(parseTimingFilter).filter(function (x) { return(x !== undefined); });
+  var filter_key = filter_words.filter(function (x) { return(parseTimingFilter(x) === undefined); }).join(" ");
 
-  _filtered = _original.filter(function (x) { return(filterClass(x, filter_cls) && findKey(x, filter_key)); })
+  _filtered = [];
+  _original.forEach(function (x, i) {
+    if(filterClass(x, filter_cls) && findKey(x, filter_key) && filter_timing.every(function (fn) { return(fn(i)); })) { _filtered.push(i); }
+  });
 
   var num_recs = ($(window).height() / 30) * 5;
   extendOplist(oplist, _filtered, 0, num_recs);
 }
 
-function initOplist(data) {
-  $("#filter-value").val("");
+function setData(data) {
   _metadata = data.metadata;
+  _descs    = data.descs;
+  _timing   = buildTiming(data.index);
   _original = data.insns;
+  _detailsCache.clear();
+}
+
+function initOplist(data) {
+  $("#filter-value").val("");
+  _base = data;
+  setData(data);
   _windowHeight = $(window).height();
   rebuildOplist();
 }
 
+function applyDelta(base, delta) {
+  // records of the base release are referred to by non-negative indices, added ones by -(index + 1)
+  var release = base.metadata.release === undefined ? "unknown" : base.metadata.release;
+  if(release != delta.base) {
+    console.error(`delta for ${delta.release} is built against ${delta.base}, not ${release}`);
+    return(null);
+  }
+  return({
+    "metadata": delta.metadata,
+    "descs": base.descs.concat(delta.descs),
+    "insns": delta.order.map(function (i) { return(i >= 0 ? base.insns[i] : delta.added[-i - 1]); }),
+    "index": delta.index
+  });
+}
+
+function switchRelease(release) {
+  if(release.delta === undefined) {
+    setData(_base);
+    rebuildOplist();
+    return;
+  }
+  if(release.name in _deltas) {
+    setData(_deltas[release.name]);
+    rebuildOplist();
+    return;
+  }
+  $.getJSON(`./data/${release.delta}`, function(delta) {
+    var data = applyDelta(_base, delta);
+    if(data === null) {
+      // fall back to the base release rather than showing records of wrong positions
+      $("#release").val(0);
+      setData(_base);
+      rebuildOplist();
+      return;
+    }
+    _deltas[release.name] = data;
+    setData(_deltas[release.name]);
+    rebuildOplist();
+  });
+}
+
+function initReleases(manifest) {
+  var releases = [{ "name": manifest.default }].concat(manifest.releases);
+  var s = $("#release");
+  releases.forEach(function (r, i) { s.append($("<option>").attr({ "value": i }).text(r.name)); });
+  s.change(function () { switchRelease(releases[$(this).val()]); });
+  s.show();
+}
+
 $.getJSON(`./data/db.json`, function(data) {
   initOplist(data);
 
@@ -336,6 +484,7 @@ $.getJSON(`./data/db.json`, function(data) {
   $("#filter-value").keyup(function () { rebuildOplist(); });
   $(window).resize(updateHeight);
   $(window).scroll(extendOnScroll);
+  $.getJSON(`./data/releases.json`, initReleases);
 });
 
 